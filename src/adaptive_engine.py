@@ -3,15 +3,116 @@ Enhanced Adaptive Engine Module
 Implements advanced rule-based logic with streak detection, confidence scoring,
 and dynamic adjustment windows
 """
+import operator
+from bisect import bisect_right
+from collections import namedtuple
+
+# Display templates for decision factors, keyed by factor code
+_FACTOR_TEMPLATES = {
+    'excellent_accuracy': "Excellent accuracy ({:.0%})",
+    'high_accuracy': "High accuracy ({:.0%})",
+    'low_accuracy': "Low accuracy ({:.0%})",
+    'steady_accuracy': "Steady accuracy ({:.0%})",
+    'hot_streak': "Hot streak ({} correct)",
+    'cold_streak': "Cold streak ({} incorrect)",
+    'fast_responses': "Fast responses ({:.1f}s avg)",
+    'slow_responses': "Slow responses ({:.1f}s avg)",
+    'low_confidence': "Low confidence - being conservative",
+    'high_confidence': "High confidence in assessment",
+}
+
+# Frozen view of AdaptiveEngine.thresholds for attribute access
+_Thresholds = namedtuple('_Thresholds', [
+    'accuracy_excellent', 'accuracy_high', 'accuracy_medium', 'accuracy_low',
+    'time_fast', 'time_optimal', 'time_slow',
+    'streak_threshold', 'consistency_threshold'
+])
+
+# Explanation templates for difficulty changes, keyed by (old, new)
+_TRANSITION_TEMPLATES = {
+    ('medium', 'hard'): "🌟 Outstanding! {accuracy:.0f}% accuracy - moving to HARD",
+    ('easy', 'medium'): "🎯 Great progress! {accuracy:.0f}% accuracy - advancing to MEDIUM",
+    ('medium', 'easy'): "📚 Adjusting to EASY for better learning pace",
+    ('hard', 'medium'): "⚖️ Adjusting to MEDIUM to optimize learning",
+}
+
+# Encouragement bands: lower accuracy bounds (%) and one message per band
+_ENCOURAGEMENT_BOUNDS = (60, 75, 90)
+_ENCOURAGEMENT_MESSAGES = (
+    "🎯 Keep practicing! Every mistake teaches us something new!",
+    "💪 Good effort! You're making solid progress!",
+    "👍 Great job! Keep up the excellent work!",
+    "⭐ Outstanding work! You're a math superstar!",
+)
+
+
+def _confidence_kernel(accuracy, time_variance, transitions, n_attempts):
+    """
+    Weighted confidence from pre-reduced statistics
+    
+    Args:
+        accuracy (float): Recent accuracy (0-1)
+        time_variance (float): Response time variance, None if too few times
+        transitions (int): Result changes in the window, None if too few attempts
+        n_attempts (int): Number of attempts in the window
+    
+    Returns:
+        float: Confidence score (0-1)
+    """
+    # Lower variance in times = higher consistency
+    if time_variance is None:
+        time_consistency = 0.5
+    else:
+        time_consistency = max(0, 1 - (time_variance / 100))  # Normalize
+    
+    # Alternating results are a bad sign
+    if transitions is None:
+        pattern_consistency = 0.5
+    else:
+        pattern_consistency = 1 - (transitions / n_attempts)
+    
+    confidence = (
+        accuracy * 0.5 +                    # 50% weight on accuracy
+        time_consistency * 0.25 +           # 25% weight on time consistency
+        pattern_consistency * 0.25          # 25% weight on pattern
+    )
+    
+    return min(1.0, max(0.0, confidence))
+
+
+def _streak_tail(recent_attempts):
+    """
+    Find the trailing run in a non-empty list of results
+    
+    Returns:
+        tuple: (last result, run length)
+    """
+    current_result = recent_attempts[-1]
+    try:
+        # First opposite result from the end, found by a C-level scan
+        return current_result, recent_attempts[::-1].index(not current_result)
+    except ValueError:
+        return current_result, len(recent_attempts)
+
 
 class AdaptiveEngine:
-    def __init__(self):
+    def __init__(self, keep_history=True, log_all=False):
+        """
+        Args:
+            keep_history (bool): Retain every decision_details dict in
+                adaptation_history; the summary statistics are kept either way
+            log_all (bool): Also record decisions that returned early because
+                the adjustment window was not reached
+        """
         self.difficulty_order = ['easy', 'medium', 'hard']
+        self._difficulty_index = {d: i for i, d in enumerate(self.difficulty_order)}
+        self._difficulty_names = tuple(self.difficulty_order)
         
         # Dynamic performance window based on difficulty
         self.base_window = 3
         self.min_window = 2
         self.max_window = 5
+        self._window_cache = {}  # (difficulty index, confidence factor) -> window
         
         # Enhanced thresholds
         self.thresholds = {
@@ -26,15 +127,41 @@ class AdaptiveEngine:
             'consistency_threshold': 0.8 # For confidence calculation
         }
         
-        # Track adaptation history
+        # Frozen at construction; the dict above is kept for inspection
+        # and serialization, the hot path reads these attributes
+        self._t = t = _Thresholds(**self.thresholds)
+        
+        # Scoring tables, checked in order, first match wins:
+        # (comparison, threshold, score delta, factor code)
+        self._accuracy_buckets = (
+            (operator.ge, t.accuracy_excellent, 3, 'excellent_accuracy'),
+            (operator.ge, t.accuracy_high, 2, 'high_accuracy'),
+            (operator.le, t.accuracy_low, -2, 'low_accuracy'),
+            (operator.ge, t.accuracy_medium, 0, 'steady_accuracy'),
+        )
+        self._time_buckets = (
+            (operator.lt, t.time_fast, 1, 'fast_responses'),
+            (operator.gt, t.time_slow, -0.5, 'slow_responses'),
+        )
+        
+        # Track adaptation history, column-wise for the summary
+        self.keep_history = keep_history
+        self.log_all = log_all
         self.adaptation_history = []
+        self._hist_types = []
+        self._hist_conf = []
+        
+        # Tail streak, maintained incrementally by update_streak()
+        self._streak_cached = {'type': None, 'length': 0}
         
     def calculate_confidence_score(self, performance_metrics, recent_attempts):
         """
         Calculate confidence score based on accuracy and consistency
         
         Args:
-            performance_metrics (dict): Overall performance data
+            performance_metrics (dict): Overall performance data; uses the
+                tracker's pre-computed 'time_variance' and 'transitions'
+                when present instead of rescanning the lists
             recent_attempts (list): List of recent attempt results (True/False)
         
         Returns:
@@ -45,63 +172,79 @@ class AdaptiveEngine:
         
         accuracy = performance_metrics['accuracy']
         
-        # Calculate consistency (how stable is performance)
-        # Lower variance in times = higher consistency
+        # Time consistency needs at least two response times
         times = performance_metrics.get('times', [])
+        variance = None
         if len(times) > 1:
-            avg_time = sum(times) / len(times)
-            variance = sum((t - avg_time) ** 2 for t in times) / len(times)
-            time_consistency = max(0, 1 - (variance / 100))  # Normalize
-        else:
-            time_consistency = 0.5
+            variance = performance_metrics.get('time_variance')
+            if variance is None:
+                avg_time = sum(times) / len(times)
+                variance = sum((t - avg_time) ** 2 for t in times) / len(times)
         
-        # Calculate pattern consistency (alternating vs steady performance)
+        # Pattern consistency needs at least three results
+        alternating = None
         if len(recent_attempts) >= 3:
-            # Check for alternating pattern (bad sign)
-            alternating = sum(1 for i in range(len(recent_attempts)-1) 
-                            if recent_attempts[i] != recent_attempts[i+1])
-            pattern_consistency = 1 - (alternating / len(recent_attempts))
-        else:
-            pattern_consistency = 0.5
+            alternating = performance_metrics.get('transitions')
+            if alternating is None:
+                alternating = sum(map(operator.ne, recent_attempts, recent_attempts[1:]))
         
-        # Weighted confidence score
-        confidence = (
-            accuracy * 0.5 +                    # 50% weight on accuracy
-            time_consistency * 0.25 +           # 25% weight on time consistency
-            pattern_consistency * 0.25          # 25% weight on pattern
-        )
+        return _confidence_kernel(accuracy, variance, alternating, len(recent_attempts))
+    
+    def update_streak(self, is_correct):
+        """
+        Update the cached tail streak with a newly recorded attempt
+        
+        Args:
+            is_correct (bool): Result of the latest attempt
         
-        return min(1.0, max(0.0, confidence))
+        Returns:
+            dict: Updated streak information
+        """
+        streak_type = 'hot' if is_correct else 'cold'
+        
+        if self._streak_cached['type'] == streak_type:
+            self._streak_cached['length'] += 1
+        else:
+            self._streak_cached = {'type': streak_type, 'length': 1}
+        
+        return self.detect_streak()
     
-    def detect_streak(self, recent_attempts):
+    def detect_streak(self, recent_attempts=None):
         """
         Detect hot/cold streaks in performance
         
+        Without arguments the streak cached by update_streak() is returned,
+        so the per-question path never rescans the attempt history.
+        
         Args:
-            recent_attempts (list): List of recent attempt results (True/False)
+            recent_attempts (list, optional): List of recent attempt results (True/False)
         
         Returns:
             dict: Streak information
         """
+        if recent_attempts is None:
+            if self._streak_cached['type'] is None:
+                return {'type': 'none', 'length': 0, 'is_significant': False}
+            
+            streak_length = self._streak_cached['length']
+            return {
+                'type': self._streak_cached['type'],
+                'length': streak_length,
+                'is_significant': streak_length >= self._t.streak_threshold
+            }
+        
         if not recent_attempts:
             return {'type': 'none', 'length': 0}
         
         # Count current streak from the end
-        current_result = recent_attempts[-1]
-        streak_length = 1
-        
-        for i in range(len(recent_attempts) - 2, -1, -1):
-            if recent_attempts[i] == current_result:
-                streak_length += 1
-            else:
-                break
+        current_result, streak_length = _streak_tail(recent_attempts)
         
         streak_type = 'hot' if current_result else 'cold'
         
         return {
             'type': streak_type,
             'length': streak_length,
-            'is_significant': streak_length >= self.thresholds['streak_threshold']
+            'is_significant': streak_length >= self._t.streak_threshold
         }
     
     def get_dynamic_window(self, current_difficulty, confidence_score):
@@ -109,33 +252,42 @@ class AdaptiveEngine:
         Calculate dynamic adjustment window based on difficulty and confidence
         
         Args:
-            current_difficulty (str): Current difficulty level
+            current_difficulty (str): Current difficulty level (lowercase)
             confidence_score (float): Confidence score (0-1)
         
         Returns:
             int: Number of attempts to consider
         """
         # Higher difficulty = larger window (more data needed)
-        difficulty_factor = self.difficulty_order.index(current_difficulty.lower())
+        difficulty_factor = self._difficulty_index[current_difficulty]
         
         # Lower confidence = larger window (need more evidence)
-        confidence_factor = 1 - confidence_score
+        confidence_factor = int((1 - confidence_score) * 2)
         
-        # Calculate window size
-        window = self.base_window + difficulty_factor + int(confidence_factor * 2)
+        key = (difficulty_factor, confidence_factor)
+        window = self._window_cache.get(key)
+        if window is None:
+            window = self.base_window + difficulty_factor + confidence_factor
+            window = max(self.min_window, min(window, self.max_window))
+            self._window_cache[key] = window
         
-        return max(self.min_window, min(window, self.max_window))
+        return window
     
     def decide_next_difficulty(self, current_difficulty, performance_metrics, 
-                               recent_attempts_list, attempts_since_last_adjustment):
+                               recent_attempts_list, attempts_since_last_adjustment,
+                               *, confidence=None, streak_info=None,
+                               optimal_window=None):
         """
         Enhanced decision logic with streak detection and confidence scoring
         
         Args:
-            current_difficulty (str): Current difficulty level
+            current_difficulty (str): Current difficulty level (lowercase)
             performance_metrics (dict): Recent performance data
             recent_attempts_list (list): List of recent correctness (True/False)
             attempts_since_last_adjustment (int): Questions since last change
+            confidence (float, optional): Pre-computed confidence score
+            streak_info (dict, optional): Pre-computed streak, e.g. from update_streak()
+            optimal_window (int, optional): Pre-computed get_dynamic_window() result
         
         Returns:
             tuple: (next_difficulty, decision_details)
@@ -145,67 +297,82 @@ class AdaptiveEngine:
         if performance_metrics['total_attempts'] < 2:
             return current_difficulty, {'reason': 'insufficient_data', 'confidence': 0}
         
-        # Calculate confidence score
-        confidence = self.calculate_confidence_score(performance_metrics, recent_attempts_list)
+        # Calculate confidence score (reuse the caller's value when available)
+        if confidence is None:
+            confidence = self.calculate_confidence_score(performance_metrics, recent_attempts_list)
         
-        # Detect streaks
-        streak_info = self.detect_streak(recent_attempts_list)
+        # Detect streaks (reuse the caller's cached streak when available)
+        if streak_info is None:
+            streak_info = self.detect_streak(recent_attempts_list)
         
         # Get dynamic window
-        optimal_window = self.get_dynamic_window(current_difficulty, confidence)
+        if optimal_window is None:
+            optimal_window = self.get_dynamic_window(current_difficulty, confidence)
+        
+        # No adjustment can fire before the window is reached: skip scoring
+        if attempts_since_last_adjustment < optimal_window:
+            decision_details = {
+                'old_difficulty': current_difficulty,
+                'new_difficulty': current_difficulty,
+                'adjustment_score': 0,
+                'confidence': confidence,
+                'streak': streak_info,
+                'factors': [],
+                'type': 'maintain',
+                'reason': 'window_not_reached',
+                'optimal_window': optimal_window,
+                'attempts_evaluated': attempts_since_last_adjustment
+            }
+            if self.log_all:
+                self._record_decision(decision_details)
+            return current_difficulty, decision_details
         
         # Extract metrics
         accuracy = performance_metrics['accuracy']
         avg_time = performance_metrics['avg_time']
         
-        current_index = self.difficulty_order.index(current_difficulty.lower())
+        current_index = self._difficulty_index[current_difficulty]
         
-        # Enhanced scoring system
+        # Enhanced scoring system; factors are (code, value) pairs,
+        # formatted on demand by format_factors()
         adjustment_score = 0
         decision_factors = []
         
         # Factor 1: Accuracy (most important) - weighted by confidence
-        if accuracy >= self.thresholds['accuracy_excellent']:
-            adjustment_score += 3 * confidence
-            decision_factors.append(f"Excellent accuracy ({accuracy*100:.0f}%)")
-        elif accuracy >= self.thresholds['accuracy_high']:
-            adjustment_score += 2 * confidence
-            decision_factors.append(f"High accuracy ({accuracy*100:.0f}%)")
-        elif accuracy <= self.thresholds['accuracy_low']:
-            adjustment_score -= 2 * confidence
-            decision_factors.append(f"Low accuracy ({accuracy*100:.0f}%)")
-        elif accuracy >= self.thresholds['accuracy_medium']:
-            decision_factors.append(f"Steady accuracy ({accuracy*100:.0f}%)")
+        for compare, threshold, delta, code in self._accuracy_buckets:
+            if compare(accuracy, threshold):
+                adjustment_score += delta * confidence
+                decision_factors.append((code, accuracy))
+                break
         
         # Factor 2: Streak detection (powerful signal)
         if streak_info['is_significant']:
             if streak_info['type'] == 'hot':
                 streak_bonus = min(2, streak_info['length'] / 3)
                 adjustment_score += streak_bonus
-                decision_factors.append(f"Hot streak ({streak_info['length']} correct)")
+                decision_factors.append(('hot_streak', streak_info['length']))
             else:
                 streak_penalty = min(2, streak_info['length'] / 3)
                 adjustment_score -= streak_penalty
-                decision_factors.append(f"Cold streak ({streak_info['length']} incorrect)")
+                decision_factors.append(('cold_streak', streak_info['length']))
         
         # Factor 3: Speed (secondary factor, only if doing reasonably well)
-        if accuracy >= self.thresholds['accuracy_medium']:
-            if avg_time < self.thresholds['time_fast']:
-                adjustment_score += 1
-                decision_factors.append(f"Fast responses ({avg_time:.1f}s avg)")
-            elif avg_time > self.thresholds['time_slow']:
-                adjustment_score -= 0.5
-                decision_factors.append(f"Slow responses ({avg_time:.1f}s avg)")
+        if accuracy >= self._t.accuracy_medium:
+            for compare, threshold, delta, code in self._time_buckets:
+                if compare(avg_time, threshold):
+                    adjustment_score += delta
+                    decision_factors.append((code, avg_time))
+                    break
         
         # Factor 4: Confidence modifier
         # High confidence = more willing to adjust
         # Low confidence = more conservative
         if confidence < 0.4:
             adjustment_score *= 0.5  # Reduce adjustment if uncertain
-            decision_factors.append("Low confidence - being conservative")
+            decision_factors.append(('low_confidence', confidence))
         elif confidence > 0.8:
             adjustment_score *= 1.2  # Increase adjustment if confident
-            decision_factors.append("High confidence in assessment")
+            decision_factors.append(('high_confidence', confidence))
         
         # Make decision based on score
         new_index = current_index
@@ -215,16 +382,16 @@ class AdaptiveEngine:
         increase_threshold = 2.0 * (1 - confidence * 0.2)  # Lower if confident
         decrease_threshold = -2.0 * (1 - confidence * 0.2)
         
-        if adjustment_score >= increase_threshold and attempts_since_last_adjustment >= optimal_window:
+        if adjustment_score >= increase_threshold:
             # Increase difficulty
-            new_index = min(current_index + 1, len(self.difficulty_order) - 1)
+            new_index = min(current_index + 1, len(self._difficulty_names) - 1)
             adjustment_type = 'increase'
-        elif adjustment_score <= decrease_threshold and attempts_since_last_adjustment >= optimal_window:
+        elif adjustment_score <= decrease_threshold:
             # Decrease difficulty
             new_index = max(current_index - 1, 0)
             adjustment_type = 'decrease'
         
-        next_difficulty = self.difficulty_order[new_index]
+        next_difficulty = self._difficulty_names[new_index]
         
         # Record adaptation decision
         decision_details = {
@@ -239,10 +406,31 @@ class AdaptiveEngine:
             'attempts_evaluated': attempts_since_last_adjustment
         }
         
-        self.adaptation_history.append(decision_details)
+        self._record_decision(decision_details)
         
         return next_difficulty, decision_details
     
+    def _record_decision(self, decision_details):
+        """Append a decision to the summary columns (and history if kept)"""
+        self._hist_types.append(decision_details['type'])
+        self._hist_conf.append(decision_details['confidence'])
+        if self.keep_history:
+            self.adaptation_history.append(decision_details)
+    
+    def format_factors(self, decision_details, limit=None):
+        """
+        Format decision factors for display
+        
+        Args:
+            decision_details (dict): Details returned by decide_next_difficulty()
+            limit (int, optional): Maximum number of factors to format
+        
+        Returns:
+            list: Human-readable factor descriptions
+        """
+        factors = decision_details.get('factors', [])[:limit]
+        return [_FACTOR_TEMPLATES[code].format(value) for code, value in factors]
+    
     def get_detailed_recommendation(self, decision_details, metrics):
         """
         Generate detailed explanation for difficulty change
@@ -269,15 +457,9 @@ class AdaptiveEngine:
         explanation_parts = []
         
         # Main reason
-        accuracy_pct = metrics['accuracy'] * 100
-        if new_diff == 'hard' and old_diff == 'medium':
-            explanation_parts.append(f"🌟 Outstanding! {accuracy_pct:.0f}% accuracy - moving to HARD")
-        elif new_diff == 'medium' and old_diff == 'easy':
-            explanation_parts.append(f"🎯 Great progress! {accuracy_pct:.0f}% accuracy - advancing to MEDIUM")
-        elif new_diff == 'easy' and old_diff == 'medium':
-            explanation_parts.append(f"📚 Adjusting to EASY for better learning pace")
-        elif new_diff == 'medium' and old_diff == 'hard':
-            explanation_parts.append(f"⚖️ Adjusting to MEDIUM to optimize learning")
+        template = _TRANSITION_TEMPLATES.get((old_diff, new_diff))
+        if template:
+            explanation_parts.append(template.format(accuracy=metrics['accuracy'] * 100))
         
         # Add streak info if significant
         if streak['is_significant']:
@@ -309,14 +491,7 @@ class AdaptiveEngine:
                 return "💪 Don't worry! Every expert was once a beginner. Let's try again!"
         
         # Standard encouragement
-        if accuracy >= 90:
-            return "⭐ Outstanding work! You're a math superstar!"
-        elif accuracy >= 75:
-            return "👍 Great job! Keep up the excellent work!"
-        elif accuracy >= 60:
-            return "💪 Good effort! You're making solid progress!"
-        else:
-            return "🎯 Keep practicing! Every mistake teaches us something new!"
+        return _ENCOURAGEMENT_MESSAGES[bisect_right(_ENCOURAGEMENT_BOUNDS, accuracy)]
     
     def get_adaptation_summary(self):
         """
@@ -325,15 +500,15 @@ class AdaptiveEngine:
         Returns:
             dict: Adaptation statistics
         """
-        if not self.adaptation_history:
+        if not self._hist_types:
             return None
         
-        total_adaptations = len(self.adaptation_history)
-        increases = sum(1 for d in self.adaptation_history if d['type'] == 'increase')
-        decreases = sum(1 for d in self.adaptation_history if d['type'] == 'decrease')
+        total_adaptations = len(self._hist_types)
+        increases = self._hist_types.count('increase')
+        decreases = self._hist_types.count('decrease')
         maintains = total_adaptations - increases - decreases
         
-        avg_confidence = sum(d['confidence'] for d in self.adaptation_history) / total_adaptations
+        avg_confidence = sum(self._hist_conf) / total_adaptations
         
         return {
             'total_evaluations': total_adaptations,
@@ -2,16 +2,51 @@
 Adaptive Math Learning System - Console Interface
 with improved UX, progress tracking, and session persistence
 """
+import sys
 import time
-from puzzle_generator import PuzzleGenerator
+from bisect import bisect_right
+from puzzle_generator import PuzzleGenerator, format_question
 from tracker import PerformanceTracker
 from adaptive_engine import AdaptiveEngine
 
+# Checked once; selects the non-interactive fast path in read_line()
+_INTERACTIVE = sys.stdin.isatty()
+
+# Rule printed around each screen section
+_BANNER = "=" * 70
+
+# Feedback for correct answers, picked by response time (< 3s, < 5s, slower)
+_CORRECT_FEEDBACK_BOUNDS = (3, 5)
+_CORRECT_FEEDBACK = (
+    "✅ Correct! ⚡ Lightning fast! ({:.1f}s)",
+    "✅ Correct! 🎯 Great speed! ({:.1f}s)",
+    "✅ Correct! ({:.1f}s)",
+)
+
+def read_line(prompt=""):
+    """
+    Prompt for and read one line of input
+    
+    Interactive terminals keep input() for line editing; piped or
+    redirected stdin writes the prompt, flushes once and reads directly.
+    """
+    if _INTERACTIVE:
+        return input(prompt)
+    
+    # Streams are looked up per call so redirection is honoured
+    stdout = sys.stdout
+    stdout.write(prompt)
+    stdout.flush()
+    line = sys.stdin.readline()
+    if not line:
+        raise EOFError
+    return line[:-1] if line.endswith("\n") else line
+
 def get_user_input(prompt, input_type=str, valid_options=None):
     """Helper function for validated input"""
     while True:
         try:
-            user_input = input(prompt).strip()
+            user_input = read_line(prompt).strip()
             
             if input_type == int:
                 user_input = int(user_input)
@@ -29,16 +64,16 @@ def get_user_input(prompt, input_type=str, valid_options=None):
 
 def display_welcome():
     """Display welcome screen"""
-    print("\n" + "="*70)
+    print("\n" + _BANNER)
     print("🎓 MATH ADVENTURES - Enhanced Adaptive Learning System")
-    print("="*70)
+    print(_BANNER)
     print("\n✨ Features:")
     print("  • Intelligent difficulty adaptation with confidence scoring")
     print("  • Hot/cold streak detection")
     print("  • Learning velocity tracking")
     print("  • Performance breakdown by operation type")
     print("  • Session history and persistence")
-    print("\n" + "="*70 + "\n")
+    print("\n" + _BANNER + "\n")
 
 def check_for_previous_sessions(username, tracker_class):
     """Check if user has previous sessions and offer to view them"""
@@ -46,15 +81,15 @@ def check_for_previous_sessions(username, tracker_class):
     
     if sessions:
         print(f"\n📚 Found {len(sessions)} previous session(s) for {username}!")
-        view_choice = input("Would you like to see your previous best session? (yes/no): ").strip().lower()
+        view_choice = read_line("Would you like to see your previous best session? (yes/no): ").strip().lower()
         
         if view_choice in ['yes', 'y']:
             # Load and display most recent session
             latest_session = tracker_class.load_session(sessions[0])
             if latest_session:
-                print(f"\n{'='*70}")
+                print("\n" + _BANNER)
                 print("📊 YOUR PREVIOUS SESSION:")
-                print(f"{'='*70}")
+                print(_BANNER)
                 print(f"Questions Answered: {latest_session['total_questions']}")
                 print(f"Accuracy: {latest_session['accuracy_percentage']:.1f}%")
                 print(f"Final Difficulty: {latest_session['final_difficulty'].upper()}")
@@ -62,8 +97,8 @@ def check_for_previous_sessions(username, tracker_class):
                 if latest_session['learning_velocity']['trend'] == 'improving':
                     print("Trend: 📈 You were improving!")
                 
-                print(f"{'='*70}\n")
-                input("Press Enter to start a new session...")
+                print(_BANNER + "\n")
+                read_line("Press Enter to start a new session...")
 
 def main():
     """Enhanced main application flow"""
@@ -105,7 +140,7 @@ def main():
     print("  • Try to maintain both accuracy and speed!")
     print()
     
-    input("Press Enter to start your adaptive learning journey...")
+    read_line("Press Enter to start your adaptive learning journey...")
     
     # Step 3: Main learning loop
     question_count = 0
@@ -116,31 +151,34 @@ def main():
         question_count += 1
         attempts_since_adjustment += 1
         
-        print("\n" + "─"*70)
-        print(f"Question {question_count} │ Difficulty: {current_difficulty.upper()}")
-        print("─"*70)
+        # Screen output is collected and written once per block
+        out = [
+            "\n" + "─"*70,
+            f"Question {question_count} │ Difficulty: {current_difficulty.upper()}",
+            "─"*70
+        ]
         
         # Show progress indicator
-        recent_perf = tracker.get_recent_performance(3)
         if question_count > 1 and attempts_since_adjustment < 5:
             questions_until_check = max(1, 3 - attempts_since_adjustment)
-            tracker.display_progress_indicator(question_count, questions_until_check)
+            out.extend(tracker.get_progress_indicator(question_count, questions_until_check))
         
-        # Generate puzzle
-        question, correct_answer = puzzle_gen.generate_puzzle(current_difficulty)
+        # Generate puzzle; the tracker records its structured form
+        op_code, a, b, correct_answer = puzzle_gen.generate_puzzle_parts(current_difficulty)
         
         # Ask question and time response
-        print(f"\n❓ {question} = ?")
-        start_time = time.time()
+        out.append(f"\n❓ {format_question(op_code, a, b)} = ?\n")
+        sys.stdout.write("\n".join(out))
+        start_ns = time.perf_counter_ns()  # monotonic, integer nanoseconds
         
-        user_answer = input("Your answer (or 'quit'): ").strip()
+        user_answer = read_line("Your answer (or 'quit'): ").strip()
         
         if user_answer.lower() == 'quit':
             print("\n👋 Thanks for practicing!")
             break
         
-        end_time = time.time()
-        time_taken = end_time - start_time
+        elapsed_ns = time.perf_counter_ns() - start_ns
+        time_taken = elapsed_ns * 1e-9
         
         # Validate answer
         try:
@@ -151,42 +189,38 @@ def main():
         
         # Record attempt
         is_correct = tracker.record_attempt(
-            question, 
+            (op_code, a, b), 
             user_answer, 
             correct_answer, 
             time_taken, 
             current_difficulty
         )
+        streak_info = adaptive_engine.update_streak(is_correct)
+        
+        # Recent performance, shared by the display and the adaptive logic
+        recent_perf = tracker.get_recent_performance(min(5, question_count))
         
         # Provide detailed feedback
+        out = []
         if is_correct:
-            if time_taken < 3:
-                print(f"✅ Correct! ⚡ Lightning fast! ({time_taken:.1f}s)")
-            elif time_taken < 5:
-                print(f"✅ Correct! 🎯 Great speed! ({time_taken:.1f}s)")
-            else:
-                print(f"✅ Correct! ({time_taken:.1f}s)")
+            feedback = _CORRECT_FEEDBACK[bisect_right(_CORRECT_FEEDBACK_BOUNDS, time_taken)]
+            out.append(feedback.format(time_taken))
         else:
-            print(f"❌ Incorrect. The answer was {correct_answer}")
+            out.append(f"❌ Incorrect. The answer was {correct_answer}")
             if time_taken < 3:
-                print("   💡 Tip: Take a moment to double-check your work!")
+                out.append("   💡 Tip: Take a moment to double-check your work!")
         
         # Show running accuracy after a few questions
         if question_count >= 3:
-            recent = tracker.get_recent_performance(min(5, question_count))
-            print(f"   📊 Recent accuracy: {recent['accuracy']*100:.0f}% "
-                  f"(last {recent['total_attempts']} questions)")
+            out.append(f"   📊 Recent accuracy: {recent_perf['accuracy']*100:.0f}% "
+                       f"(last {recent_perf['total_attempts']} questions)")
         
         # Enhanced adaptive logic with dynamic window
         if question_count >= 2:  # Can start adapting after 2 questions
-            recent_performance = tracker.get_recent_performance(
-                min(question_count, 5)
-            )
-            
             # Get confidence-based dynamic window
             confidence = adaptive_engine.calculate_confidence_score(
-                recent_performance,
-                recent_performance['attempts_list']
+                recent_perf,
+                recent_perf['attempts_list']
             )
             optimal_window = adaptive_engine.get_dynamic_window(
                 current_difficulty, 
@@ -202,42 +236,44 @@ def main():
             if should_check_adjustment:
                 old_difficulty = current_difficulty
                 
-                # Get streak info for encouragement
-                streak_info = adaptive_engine.detect_streak(
-                    recent_performance['attempts_list']
-                )
-                
                 # Decide next difficulty
                 current_difficulty, decision_details = adaptive_engine.decide_next_difficulty(
                     current_difficulty,
-                    recent_performance,
-                    recent_performance['attempts_list'],
-                    attempts_since_adjustment
+                    recent_perf,
+                    recent_perf['attempts_list'],
+                    attempts_since_adjustment,
+                    confidence=confidence,
+                    streak_info=streak_info,
+                    optimal_window=optimal_window
                 )
                 
                 # Show adaptation message
                 if old_difficulty != current_difficulty:
-                    print("\n" + "🔄 " + "─"*66)
+                    out.append("\n" + "🔄 " + "─"*66)
                     reason = adaptive_engine.get_detailed_recommendation(
                         decision_details,
-                        recent_performance
+                        recent_perf
                     )
-                    print(f"   {reason}")
+                    out.append(f"   {reason}")
                     
                     # Show factors considered
                     if len(decision_details['factors']) > 0:
-                        print(f"   📋 Factors: {', '.join(decision_details['factors'][:2])}")
+                        factors = adaptive_engine.format_factors(decision_details, limit=2)
+                        out.append(f"   📋 Factors: {', '.join(factors)}")
                     
-                    print("─"*70)
+                    out.append("─"*70)
                     attempts_since_adjustment = 0
                     last_adjustment_question = question_count
                 
                 # Show encouragement
                 encouragement = adaptive_engine.get_encouragement(
-                    recent_performance, 
+                    recent_perf, 
                     streak_info
                 )
-                print(f"\n   {encouragement}")
+                out.append(f"\n   {encouragement}")
+        
+        out.append("")
+        sys.stdout.write("\n".join(out))
         
         # Ask if user wants to continue after milestone
         if question_count >= 5 and question_count % 5 == 0:
@@ -257,16 +293,17 @@ def main():
             
             print("─"*70)
             
-            continue_choice = input("\n▶️  Continue? (yes/no): ").strip().lower()
+            continue_choice = read_line("\n▶️  Continue? (yes/no): ").strip().lower()
             if continue_choice in ['no', 'n']:
                 break
     
     # Step 4: Display comprehensive session summary
-    print("\n" + "="*70)
+    print("\n" + _BANNER)
     print("📊 FINAL SESSION REPORT")
-    print("="*70)
+    print(_BANNER)
     
-    tracker.display_summary()
+    summary = tracker.get_session_summary()
+    tracker.display_summary(summary)
     
     # Show adaptation insights
     adaptation_summary = adaptive_engine.get_adaptation_summary()
@@ -278,7 +315,6 @@ def main():
         print(f"  Average Confidence: {adaptation_summary['average_confidence']:.0%}")
     
     # Additional personalized insights
-    summary = tracker.get_session_summary()
     if summary and summary['total_questions'] >= 3:
         print("\n💡 PERSONALIZED RECOMMENDATIONS:")
         
@@ -317,13 +353,14 @@ def main():
     
     # Save session
     print()
-    save_choice = input("💾 Save this session for future reference? (yes/no): ").strip().lower()
+    save_choice = read_line("💾 Save this session for future reference? (yes/no): ").strip().lower()
     if save_choice in ['yes', 'y']:
-        tracker.save_session()
+        # Written in the background; a failure is reported when it happens
+        tracker.save_session(summary)
     
-    print("\n" + "="*70)
+    print("\n" + _BANNER)
     print("✨ Thank you for using Math Adventures! Keep learning! 🎉")
-    print("="*70 + "\n")
+    print(_BANNER + "\n")
 
 if __name__ == "__main__":
     try:
@@ -4,6 +4,48 @@ Generates math problems based on difficulty level
 """
 import random
 
+# Integer operation codes, used to index the puzzle handlers
+OP_ADD, OP_SUB, OP_MUL, OP_DIV = range(4)
+_OP_CODES = {'+': OP_ADD, '-': OP_SUB, '*': OP_MUL, '/': OP_DIV}
+
+# Display symbol and operation label per op code
+OP_SYMBOLS = ('+', '-', '×', '÷')
+OP_NAMES = ('addition', 'subtraction', 'multiplication', 'division')
+
+# Operand ranges (start, stop) per op code; None uses the level's range
+# Keep numbers smaller for multiplication, and division operands are
+# (divisor, quotient) so every division is clean
+_OPERAND_RANGES = (None, None, (2, 13), (2, 11))
+
+
+def format_question(op_code, a, b):
+    """Render a structured puzzle (op_code, a, b) as its question string"""
+    return f"{a} {OP_SYMBOLS[op_code]} {b}"
+
+
+def _addition(num1, num2, is_easy):
+    return num1, num2, num1 + num2
+
+
+def _subtraction(num1, num2, is_easy):
+    # Ensure positive result for easy level
+    if is_easy and num1 < num2:
+        num1, num2 = num2, num1
+    return num1, num2, num1 - num2
+
+
+def _multiplication(num1, num2, is_easy):
+    return num1, num2, num1 * num2
+
+
+def _division(divisor, quotient, is_easy):
+    return divisor * quotient, divisor, quotient
+
+
+# Handlers indexed by op code, each returning (a, b, answer)
+_HANDLERS = (_addition, _subtraction, _multiplication, _division)
+
+
 class PuzzleGenerator:
     def __init__(self):
         self.difficulty_levels = {
@@ -11,6 +53,24 @@ class PuzzleGenerator:
             'medium': {'range': (5, 50), 'operations': ['+', '-', '*']},
             'hard': {'range': (10, 100), 'operations': ['+', '-', '*', '/']}
         }
+        
+        # Private RNG instance avoids module-level lookups on every call
+        self._rng = random.Random()
+        
+        # Flattened per-level state: (operand ranges by op code, op codes, is_easy)
+        self._levels = {}
+        for name, level in self.difficulty_levels.items():
+            level_range = (level['range'][0], level['range'][1] + 1)
+            operand_ranges = tuple(r or level_range for r in _OPERAND_RANGES)
+            operations = tuple(_OP_CODES[op] for op in level['operations'])
+            self._levels[name] = (operand_ranges, operations, name == 'easy')
+    
+    def _get_level(self, difficulty):
+        """Return flattened level state, falling back to easy"""
+        level = self._levels.get(difficulty)
+        if level is None:
+            level = self._levels.get(difficulty.lower(), self._levels['easy'])
+        return level
     
     def generate_puzzle(self, difficulty='easy'):
         """
@@ -22,41 +82,69 @@ class PuzzleGenerator:
         Returns:
             tuple: (question_string, correct_answer)
         """
-        level = self.difficulty_levels.get(difficulty.lower(), self.difficulty_levels['easy'])
-        min_val, max_val = level['range']
-        operation = random.choice(level['operations'])
+        op_code, a, b, answer = self.generate_puzzle_parts(difficulty)
+        return format_question(op_code, a, b), answer
+    
+    def generate_puzzle_parts(self, difficulty='easy'):
+        """
+        Generate a math puzzle as structured parts
         
-        num1 = random.randint(min_val, max_val)
-        num2 = random.randint(min_val, max_val)
+        The question string can be built later with format_question(),
+        and PerformanceTracker.record_attempt() accepts (op_code, a, b)
+        directly.
         
-        # Create puzzle based on operation
-        if operation == '+':
-            answer = num1 + num2
-            question = f"{num1} + {num2}"
-            
-        elif operation == '-':
-            # Ensure positive result for easy level
-            if difficulty.lower() == 'easy' and num1 < num2:
-                num1, num2 = num2, num1
-            answer = num1 - num2
-            question = f"{num1} - {num2}"
+        Args:
+            difficulty (str): 'easy', 'medium', or 'hard'
             
-        elif operation == '*':
-            # Keep numbers smaller for multiplication
-            num1 = random.randint(2, 12)
-            num2 = random.randint(2, 12)
-            answer = num1 * num2
-            question = f"{num1} × {num2}"
+        Returns:
+            tuple: (op_code, a, b, correct_answer)
+        """
+        operand_ranges, operations, is_easy = self._get_level(difficulty)
+        rng = self._rng
+        randrange = rng.randrange
+        operation = rng.choice(operations)
+        
+        start, stop = operand_ranges[operation]
+        num1 = randrange(start, stop)
+        num2 = randrange(start, stop)
+        
+        return (operation,) + _HANDLERS[operation](num1, num2, is_easy)
+    
+    def generate_puzzles(self, difficulty='easy', n=10):
+        """
+        Generate a batch of math puzzles at one difficulty level
+        
+        Operands are drawn per operation in bulk with random.choices,
+        instead of several randrange calls per puzzle.
+        
+        Args:
+            difficulty (str): 'easy', 'medium', or 'hard'
+            n (int): Number of puzzles
             
-        elif operation == '/':
-            # Ensure clean division
-            num2 = random.randint(2, 10)
-            answer = random.randint(2, 10)
-            num1 = num2 * answer
-            question = f"{num1} ÷ {num2}"
-        
-        return question, answer
+        Returns:
+            tuple: (list of question strings, list of correct answers)
+        """
+        operand_ranges, operations, is_easy = self._get_level(difficulty)
+        choices = self._rng.choices
+        ops = choices(operations, k=n)
+        
+        # One bulk draw of both operands for each operation used
+        operands = {}
+        for op in set(ops):
+            population = range(*operand_ranges[op])
+            count = ops.count(op)
+            operands[op] = zip(choices(population, k=count),
+                               choices(population, k=count))
+        
+        questions = []
+        answers = []
+        for op in ops:
+            a, b, answer = _HANDLERS[op](*next(operands[op]), is_easy)
+            questions.append(format_question(op, a, b))
+            answers.append(answer)
+        
+        return questions, answers
     
     def get_difficulty_levels(self):
         """Return list of available difficulty levels"""
-        return list(self.difficulty_levels.keys())
\ No newline at end of file
+        return list(self.difficulty_levels.keys())
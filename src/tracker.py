@@ -3,77 +3,243 @@ Performance Tracker Module
 Tracks user performance metrics across the session
 """
 
+import re
+import sys
 import time
 import os
 import json
+import atexit
+import operator
+from array import array
+from collections import Counter, deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from functools import partial
+from itertools import islice
+
+from puzzle_generator import OP_NAMES, OP_SYMBOLS, format_question
+
+# Operator symbol -> operation label, derived from the generator's op
+# tables; one regex scan finds the symbol in a question string
+_LABEL_BY_SYMBOL = dict(zip(OP_SYMBOLS, OP_NAMES))
+_OP_RE = re.compile('[' + re.escape(''.join(OP_SYMBOLS)) + ']')
+
+# One shared string object per known difficulty label; equal strings built
+# elsewhere are mapped onto it, any other value is stored as given
+_DIFFICULTIES = {d: sys.intern(d) for d in ('easy', 'medium', 'hard')}
+
+# Rule printed around the session summary
+_BANNER = "=" * 50
+
+# Session files are written by one background worker shared by every
+# tracker, so saves never block the interactive loop and land in order.
+# It is created on the first save; pending writes are flushed at exit
+_save_executor = None
+
+
+def _get_save_executor():
+    """Return the shared save worker, starting it on first use"""
+    global _save_executor
+    if _save_executor is None:
+        _save_executor = ThreadPoolExecutor(max_workers=1)
+        atexit.register(_save_executor.shutdown, wait=True)
+    return _save_executor
+
+
+def _report_save_failure(filepath, future):
+    """Done-callback for a queued save: print the error if the write failed"""
+    # Runs on the worker, so failures are reported even if nobody waits
+    error = None if future.cancelled() else future.exception()
+    if error is not None:
+        print(f"❌ Could not save session to {filepath}: {error}")
+
+
+# A single recorded attempt; tuple-backed, so no per-record dict
+Attempt = namedtuple('Attempt', [
+    'question', 'user_answer', 'correct_answer', 'is_correct',
+    'time_taken', 'difficulty', 'op', 'timestamp_ns',
+])
 
 
 class PerformanceTracker:
+    # Size of the recent-attempts ring buffer (AdaptiveEngine.max_window)
+    MAX_WINDOW = 5
+
     def __init__(self, username):
         self.username = username
         self.session_start = datetime.now()
-        self.attempts = []
+        # Monotonic clock reading matching session_start; attempt
+        # timestamps and the session duration are measured against it
+        self._session_start_ns = time.monotonic_ns()
+        # Full attempt log, index-aligned with the column arrays below
+        self.attempts = deque()
         self.current_difficulty = None
 
+        # Per-field columns over the full history (struct of arrays),
+        # used by the summary methods instead of scanning attempt dicts
+        self._correct = array('b')
+        self._times = array('d')
+        self._difficulties = []
+
+        # Running totals, updated on every record_attempt() so the
+        # summaries never re-scan the history
+        self._correct_total = 0
+        self._time_total = 0.0
+        self._op_totals = Counter()
+        self._op_correct = Counter()
+        # _prefix_correct[i] is the number correct among the first i attempts
+        self._prefix_correct = array('i', [0])
+
+        # Results are valid until the next record_attempt(), which bumps
+        # the version; caches are keyed on it
+        self._version = 0
+        self._summary_cache = (None, -1)
+        self._recent_cache = {}
+        self._recent_cache_version = 0
+
+        # Ring buffer of (is_correct, time_taken) for the latest attempts,
+        # with counters kept up to date on every record_attempt()
+        self._recent = deque(maxlen=self.MAX_WINDOW)
+        self._recent_correct = 0
+        self._recent_transitions = 0
+        # (results, times) tuples for the buffer, rebuilt once per attempt
+        self._recent_view = None
+
+        # Future of this tracker's latest queued save
+        self._last_save = None
+
     def record_attempt(self, question, user_answer, correct_answer,
                        time_taken, difficulty):
         """
         Record a single attempt
 
         Args:
-            question (str): The math question asked
+            question: The math question asked, either its string or a
+                structured (op_code, a, b) puzzle as produced by
+                PuzzleGenerator.generate_puzzle_parts()
             user_answer: User's answer
             correct_answer: Correct answer
             time_taken (float): Time in seconds
             difficulty (str): Current difficulty level
         """
         is_correct = (user_answer == correct_answer)
+        difficulty = _DIFFICULTIES.get(difficulty, difficulty)
+        if isinstance(question, str):
+            match = _OP_RE.search(question)
+            op = _LABEL_BY_SYMBOL[match.group()] if match else 'other'
+        else:
+            # Structured puzzles carry their op code; no string to scan
+            op = OP_NAMES[question[0]]
 
-        attempt = {
-            'question': question,
-            'user_answer': user_answer,
-            'correct_answer': correct_answer,
-            'is_correct': is_correct,
-            'time_taken': time_taken,
-            'difficulty': difficulty,
-            'timestamp': datetime.now()
-        }
+        attempt = Attempt(question, user_answer, correct_answer, is_correct,
+                          time_taken, difficulty, op, time.monotonic_ns())
 
         self.attempts.append(attempt)
+        self._correct.append(is_correct)
+        self._times.append(time_taken)
+        self._difficulties.append(difficulty)
+        self._correct_total += is_correct
+        self._time_total += time_taken
+        self._op_totals[op] += 1
+        self._op_correct[op] += is_correct
+        self._prefix_correct.append(self._correct_total)
+        self._push_recent(is_correct, time_taken)
         self.current_difficulty = difficulty
+        self._version += 1
 
         return is_correct
 
+    def question_str(self, i):
+        """Return the question string of the i-th attempt of the session"""
+        question = self.attempts[i].question
+        if isinstance(question, str):
+            return question
+        return format_question(*question)
+
+    def _push_recent(self, is_correct, time_taken):
+        """Append to the ring buffer, updating counters for any evicted entry"""
+        recent = self._recent
+        if len(recent) == recent.maxlen:
+            evicted = recent[0][0]
+            self._recent_correct -= evicted
+            if evicted != recent[1][0]:
+                self._recent_transitions -= 1
+        if recent and recent[-1][0] != is_correct:
+            self._recent_transitions += 1
+
+        recent.append((is_correct, time_taken))
+        self._recent_correct += is_correct
+        self._recent_view = None
+
     def get_recent_performance(self, n=3):
         """
         Get performance metrics for last n attempts
 
+        'attempts_list' and 'times' are read-only tuples; the result is
+        cached and shared between calls until the next record_attempt(),
+        so treat it as read-only. When n covers the whole recent window
+        the tuples are built once per attempt from the ring buffer, so
+        repeated reads allocate nothing.
+
         Returns:
             dict: Performance metrics
         """
+        if self._recent_cache_version != self._version:
+            self._recent_cache = {}
+            self._recent_cache_version = self._version
+
+        metrics = self._recent_cache.get(n)
+        if metrics is None:
+            metrics = self._recent_cache[n] = self._compute_recent_performance(n)
+        return metrics
+
+    def _compute_recent_performance(self, n):
+        """Compute metrics for the last n attempts (uncached)"""
         if not self.attempts:
             return {
                 'accuracy': 0,
                 'avg_time': 0,
                 'total_attempts': 0,
-                'attempts_list': [],
-                'times': []
+                'attempts_list': (),
+                'times': ()
             }
 
-        recent = self.attempts[-n:] if len(self.attempts) >= n else self.attempts
+        if self.MAX_WINDOW >= n >= len(self._recent) and n > 0:
+            # Whole ring buffer: counters are already maintained
+            if self._recent_view is None:
+                self._recent_view = tuple(zip(*self._recent))
+            attempts_list, times = self._recent_view
+            correct_count = self._recent_correct
+            transitions = self._recent_transitions
+        else:
+            if n > self.MAX_WINDOW or n <= 0:
+                attempts_list = tuple(map(bool, self._correct[-n:]))
+                times = tuple(self._times[-n:])
+            else:
+                recent = self._recent
+                attempts_list, times = zip(*islice(recent, len(recent) - n, None))
+            correct_count = sum(attempts_list)
+            transitions = sum(map(operator.ne, attempts_list, attempts_list[1:]))
+
+        total_count = len(times)
 
-        correct_count = sum(1 for a in recent if a['is_correct'])
-        total_count = len(recent)
-        avg_time = sum(a['time_taken'] for a in recent) / total_count
+        # Welford's running mean/M2 for response times
+        time_mean = 0.0
+        time_m2 = 0.0
+        for count, t in enumerate(times, 1):
+            delta = t - time_mean
+            time_mean += delta / count
+            time_m2 += delta * (t - time_mean)
 
         return {
             'accuracy': correct_count / total_count if total_count > 0 else 0,
-            'avg_time': avg_time,
+            'avg_time': time_mean,
+            'time_variance': time_m2 / total_count,
+            'transitions': transitions,
             'total_attempts': total_count,
             'correct_count': correct_count,
-            'attempts_list': [a['is_correct'] for a in recent],
-            'times': [a['time_taken'] for a in recent]
+            'attempts_list': attempts_list,
+            'times': times
         }
 
     def get_session_summary(self):
@@ -86,13 +252,25 @@ class PerformanceTracker:
         if not self.attempts:
             return None
 
-        total = len(self.attempts)
-        correct = sum(1 for a in self.attempts if a['is_correct'])
+        summary, version = self._summary_cache
+        if version != self._version:
+            summary = self._compute_session_summary()
+            self._summary_cache = (summary, self._version)
+
+        # Duration keeps running between attempts, so it is never cached
+        duration = (time.monotonic_ns() - self._session_start_ns) // 1_000_000_000
+        return dict(summary, session_duration=duration)
+
+    def _compute_session_summary(self):
+        """Compute session statistics (uncached, without duration)"""
+
+        total = len(self._correct)
+        correct = self._correct_total
         accuracy = (correct / total * 100) if total > 0 else 0
-        avg_time = sum(a['time_taken'] for a in self.attempts) / total
+        avg_time = self._time_total / total
 
         # Difficulty progression
-        difficulty_changes = [a['difficulty'] for a in self.attempts]
+        difficulty_changes = list(self._difficulties)
 
         # Operation breakdown
         operation_breakdown = self.get_operation_breakdown()
@@ -108,47 +286,34 @@ class PerformanceTracker:
             'average_time': avg_time,
             'final_difficulty': self.current_difficulty,
             'difficulty_progression': difficulty_changes,
-            'session_duration': (datetime.now() - self.session_start).seconds,
             'operation_breakdown': operation_breakdown,
             'learning_velocity': learning_velocity
         }
 
     def get_operation_breakdown(self):
         """Return breakdown of performance by operation type"""
-        breakdown = {}
-        for a in self.attempts:
-            if '+' in a['question']:
-                op = 'addition'
-            elif '-' in a['question']:
-                op = 'subtraction'
-            elif '×' in a['question']:
-                op = 'multiplication'
-            elif '÷' in a['question']:
-                op = 'division'
-            else:
-                op = 'other'
-
-            if op not in breakdown:
-                breakdown[op] = {'total': 0, 'correct': 0}
-            breakdown[op]['total'] += 1
-            if a['is_correct']:
-                breakdown[op]['correct'] += 1
+        correct = self._op_correct
 
-        for op, stats in breakdown.items():
-            stats['accuracy'] = (stats['correct'] / stats['total']) * 100 if stats['total'] > 0 else 0
-        return breakdown
+        return {
+            op: {
+                'total': total,
+                'correct': correct[op],
+                'accuracy': (correct[op] / total) * 100
+            }
+            for op, total in self._op_totals.items()
+        }
 
     def get_learning_velocity(self):
         """Estimate improvement trend across session"""
-        if len(self.attempts) < 4:
+        total = len(self._correct)
+        if total < 4:
             return {'trend': 'insufficient_data'}
 
-        midpoint = len(self.attempts) // 2
-        first_half = self.attempts[:midpoint]
-        second_half = self.attempts[midpoint:]
+        midpoint = total // 2
+        first_correct = self._prefix_correct[midpoint]
 
-        acc1 = sum(1 for a in first_half if a['is_correct']) / len(first_half)
-        acc2 = sum(1 for a in second_half if a['is_correct']) / len(second_half)
+        acc1 = first_correct / midpoint
+        acc2 = (self._correct_total - first_correct) / (total - midpoint)
 
         if acc2 > acc1 + 0.1:
             trend = 'improving'
@@ -159,17 +324,18 @@ class PerformanceTracker:
 
         return {'trend': trend, 'start_accuracy': acc1, 'end_accuracy': acc2}
 
-    def display_summary(self):
-        """Print formatted session summary"""
-        summary = self.get_session_summary()
+    def display_summary(self, summary=None):
+        """Print formatted session summary, computing it if not given"""
+        if summary is None:
+            summary = self.get_session_summary()
 
         if not summary:
             print("No attempts recorded yet.")
             return
 
-        print("\n" + "=" * 50)
+        print("\n" + _BANNER)
         print(f"SESSION SUMMARY FOR {summary['username'].upper()}")
-        print("=" * 50)
+        print(_BANNER)
         print(f"Total Questions: {summary['total_questions']}")
         print(f"Correct Answers: {summary['correct_answers']}")
         print(f"Accuracy: {summary['accuracy_percentage']:.1f}%")
@@ -178,14 +344,19 @@ class PerformanceTracker:
         print(f"Session Duration: {summary['session_duration']} seconds")
         print("\nDifficulty Progression:")
         print(" → ".join(summary['difficulty_progression']))
-        print("=" * 50)
-    def display_progress_indicator(self, question_count, questions_until_check):
-        """Display a simple progress indicator in the console"""
-        print(f"\n📈 Progress: Question {question_count}")
+        print(_BANNER)
+    def get_progress_indicator(self, question_count, questions_until_check):
+        """Return the progress indicator as a list of console lines"""
+        lines = [f"\n📈 Progress: Question {question_count}"]
         if questions_until_check > 0:
-            print(f"   🔄 System will re-evaluate difficulty after {questions_until_check} more question(s).")
+            lines.append(f"   🔄 System will re-evaluate difficulty after {questions_until_check} more question(s).")
         else:
-            print("   ⚙️ Evaluating your recent performance for difficulty adjustment...")
+            lines.append("   ⚙️ Evaluating your recent performance for difficulty adjustment...")
+        return lines
+
+    def display_progress_indicator(self, question_count, questions_until_check):
+        """Display a simple progress indicator in the console"""
+        print("\n".join(self.get_progress_indicator(question_count, questions_until_check)))
 
 
     # ────────────────────────────────
@@ -198,29 +369,84 @@ class PerformanceTracker:
         session_dir = os.path.join("data", "sessions")
         if not os.path.exists(session_dir):
             return []
-        files = [
-            os.path.join(session_dir, f)
-            for f in os.listdir(session_dir)
-            if f.startswith(f"{username}_") and f.endswith(".json")
-        ]
-        return sorted(files, key=os.path.getmtime, reverse=True)
-
-    def save_session(self):
-        """Save current session data to JSON file in data/sessions"""
+        prefix = f"{username}_"
+        # DirEntry carries its path and caches stat(), so non-matching
+        # names cost nothing and matches need no separate getmtime()
+        with os.scandir(session_dir) as it:
+            entries = [
+                e for e in it
+                if e.name.startswith(prefix) and e.name.endswith(".json")
+            ]
+        entries.sort(key=lambda e: e.stat().st_mtime, reverse=True)
+        return [e.path for e in entries]
+
+    def save_session(self, summary=None, durable=False):
+        """
+        Save current session data to JSON file in data/sessions
+
+        The file is written in the background and this returns at once;
+        a failed write is reported when it happens. Call wait_for_saves()
+        before reading the file back.
+
+        Args:
+            summary (dict): Already computed session summary, if any
+            durable (bool): fsync the file before it replaces the target
+
+        Returns:
+            str: Path of the session file
+        """
         session_dir = os.path.join("data", "sessions")
         os.makedirs(session_dir, exist_ok=True)
 
-        data = self.get_session_summary()
+        # The summary is a fresh dict, so it is a safe snapshot to hand off
+        data = summary if summary is not None else self.get_session_summary()
         timestamp = int(time.time())
         filename = f"{self.username}_{timestamp}.json"
         filepath = os.path.join(session_dir, filename)
 
-        with open(filepath, "w") as f:
-            json.dump(data, f, default=str, indent=2)
+        self._last_save = _get_save_executor().submit(self._save_sync, filepath, data, durable)
+        self._last_save.add_done_callback(partial(_report_save_failure, filepath))
 
-        print(f"💾 Session saved successfully at {filepath}")
+        print(f"💾 Saving session to {filepath}...")
         return filepath
 
+    @staticmethod
+    def _save_sync(filepath, data, durable=False):
+        """
+        Write session data to filepath (runs on the save worker)
+
+        The file is written beside the target and renamed over it, so
+        readers never see a partially written session.
+
+        Args:
+            filepath (str): Destination path
+            data (dict): Session data to serialize
+            durable (bool): fsync before the rename, trading latency for
+                surviving a power loss
+        """
+        # Encode to one string and write it in a single call; json.dump
+        # would issue a write per encoded fragment
+        payload = json.dumps(data, default=str, indent=2)
+        tmp_path = filepath + ".tmp"
+        try:
+            with open(tmp_path, "w") as f:
+                f.write(payload)
+                if durable:
+                    f.flush()
+                    os.fsync(f.fileno())
+            os.replace(tmp_path, filepath)
+        except BaseException:
+            # Don't leave a partial file behind; the error still surfaces
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def wait_for_saves(self):
+        """Block until queued session saves are on disk, re-raising errors"""
+        # One worker runs saves in order, so the last one finishes last
+        if self._last_save is not None:
+            self._last_save.result()
+
     @staticmethod
     def load_session(filepath):
         """Load session data from JSON file"""
@@ -12,15 +12,19 @@ import sys
 import os
 sys.path.insert(0, 'src')
 
-from puzzle_generator import PuzzleGenerator
+from puzzle_generator import PuzzleGenerator, format_question, OP_MUL
 from tracker import PerformanceTracker
 from adaptive_engine import AdaptiveEngine
 
+# Rules printed around test headers and the suite banner
+_BANNER = "=" * 70
+_ROCKETS = "🚀 " * 35
+
 def print_test_header(test_name):
     """Print formatted test header"""
-    print("\n" + "="*70)
+    print("\n" + _BANNER)
     print(f"🧪 {test_name}")
-    print("="*70)
+    print(_BANNER)
 
 def print_success(message):
     """Print success message"""
@@ -40,6 +44,20 @@ def test_puzzle_generator():
         print_info(f"{difficulty.upper()}: {question} = {answer}")
         assert answer is not None, f"Answer should not be None for {difficulty}"
     
+    # Test batch generation
+    questions, answers = gen.generate_puzzles('hard', 20)
+    print_info(f"Batch: {len(questions)} puzzles, e.g. {questions[0]} = {answers[0]}")
+    assert len(questions) == len(answers) == 20, "Batch should return 20 puzzles"
+    for question, answer in zip(questions, answers):
+        if '÷' in question:
+            dividend, divisor = map(int, question.split(' ÷ '))
+            assert dividend == divisor * answer, "Division should be clean"
+    
+    # Test structured puzzles
+    op_code, a, b, answer = gen.generate_puzzle_parts('medium')
+    print_info(f"Structured: {(op_code, a, b)} -> {format_question(op_code, a, b)} = {answer}")
+    assert answer == [a + b, a - b, a * b][op_code], "Structured answer should match operands"
+    
     print_success("Puzzle Generator works correctly!")
     return True
 
@@ -59,12 +77,30 @@ def test_performance_tracker():
     print_info(f"Accuracy: {metrics['accuracy']*100:.0f}%")
     print_info(f"Avg Time: {metrics['avg_time']:.1f}s")
     assert metrics['accuracy'] == 1.0, "All answers correct, should be 100%"
-    
+
+    # Test single-pass variance and transitions
+    times = metrics['times']
+    mean = sum(times) / len(times)
+    expected_variance = sum((t - mean) ** 2 for t in times) / len(times)
+    print_info(f"Time variance: {metrics['time_variance']:.3f}")
+    assert abs(metrics['time_variance'] - expected_variance) < 1e-9, "Variance should match two-pass result"
+    assert metrics['transitions'] == 0, "No result changes in an all-correct window"
+
+    # Repeated reads share the same result objects until the next attempt
+    window = tracker.get_recent_performance(4)
+    assert tracker.get_recent_performance(4)['times'] is window['times'], "Window should not be re-copied"
+    assert isinstance(window['attempts_list'], tuple), "Window results should be read-only"
+
     # Test operation breakdown
     op_breakdown = tracker.get_operation_breakdown()
     print_info(f"Operations tracked: {list(op_breakdown.keys())}")
     assert 'addition' in op_breakdown, "Should track addition"
     
+    # Test structured question records
+    tracker.record_attempt((OP_MUL, 6, 7), 42, 42, 3.5, "medium")
+    assert tracker.question_str(-1) == "6 × 7", "Question should be rebuilt on demand"
+    assert tracker.get_operation_breakdown()['multiplication']['total'] == 2, "Structured op should be tracked"
+    
     # Test learning velocity
     for i in range(6):  # Add more attempts for velocity calculation
         tracker.record_attempt(f"Q{i}", i, i, 3.0, "easy")
@@ -132,7 +168,15 @@ def test_streak_detection():
     streak_info = engine.detect_streak(no_streak)
     print_info(f"No streak: {streak_info}")
     assert not streak_info['is_significant'], "Alternating should not be significant"
-    
+
+    # Test incremental streak tracking
+    for result in [False, True, True, True]:
+        streak_info = engine.update_streak(result)
+    print_info(f"Incremental streak: {streak_info}")
+    assert streak_info['type'] == 'hot', "Should track hot streak incrementally"
+    assert streak_info['length'] == 3, "Streak should reset after a miss"
+    assert engine.detect_streak() == streak_info, "Cached streak should match"
+
     print_success("Streak Detection works correctly!")
     return True
 
@@ -178,7 +222,7 @@ def test_adaptive_engine_decisions():
     )
     print_info(f"High performance: {next_diff} (from easy)")
     print_info(f"Confidence: {details['confidence']:.2f}")
-    print_info(f"Factors: {', '.join(details['factors'][:2])}")
+    print_info(f"Factors: {', '.join(engine.format_factors(details, limit=2))}")
     assert next_diff == 'medium', "Should increase difficulty"
     assert details['confidence'] > 0.7, "Should have high confidence"
     
@@ -227,6 +271,7 @@ def test_session_persistence():
     
     # Save session
     filename = tracker.save_session()
+    tracker.wait_for_saves()
     print_info(f"Session saved: {filename}")
     assert filename is not None, "Should save successfully"
     assert os.path.exists(filename), "File should exist"
@@ -238,10 +283,17 @@ def test_session_persistence():
     assert loaded_data['username'] == "PersistenceTest", "Username should match"
     assert loaded_data['total_questions'] == 5, "Question count should match"
     
+    # Test durable atomic save leaves no temp file behind
+    durable_file = tracker.save_session(durable=True)
+    tracker.wait_for_saves()
+    assert os.path.exists(durable_file), "Durable save should exist"
+    assert not os.path.exists(durable_file + ".tmp"), "Temp file should be renamed away"
+    
     # Clean up
-    if os.path.exists(filename):
-        os.remove(filename)
-        print_info("Test file cleaned up")
+    for path in {filename, durable_file}:
+        if os.path.exists(path):
+            os.remove(path)
+            print_info("Test file cleaned up")
     
     print_success("Session Persistence works correctly!")
     return True
@@ -297,6 +349,11 @@ def test_integration_scenario():
     print_info(f"Final difficulty: {summary['final_difficulty']}")
     print_info(f"Learning trend: {summary['learning_velocity']['trend']}")
     
+    adaptation = engine.get_adaptation_summary()
+    print_info(f"Evaluations: {adaptation['total_evaluations']}, "
+               f"increases: {adaptation['difficulty_increases']}")
+    assert adaptation['total_evaluations'] == len(engine.adaptation_history), "Summary should cover every decision"
+    
     # Verify progression
     assert summary['final_difficulty'] != 'easy', "Should have progressed beyond easy"
     assert summary['accuracy_percentage'] >= 80, "Should maintain high accuracy"
@@ -356,14 +413,27 @@ def test_edge_cases():
     print_info(f"At min difficulty: {next_diff} (should stay easy)")
     assert next_diff == 'easy', "Cannot go below easy"
     
+    # Window not reached: early exit, not logged unless log_all is set
+    evaluations = len(engine.adaptation_history)
+    next_diff, details = engine.decide_next_difficulty(
+        'easy', boundary_perf, [True] * 5, 1
+    )
+    print_info(f"Before window: {next_diff} ({details['reason']})")
+    assert details['reason'] == 'window_not_reached', "Should exit before scoring"
+    assert len(engine.adaptation_history) == evaluations, "Early exit should not be logged"
+    
+    logging_engine = AdaptiveEngine(log_all=True)
+    logging_engine.decide_next_difficulty('easy', boundary_perf, [True] * 5, 1)
+    assert logging_engine.get_adaptation_summary()['total_evaluations'] == 1, "log_all should record early exits"
+    
     print_success("Edge Cases handled correctly!")
     return True
 
 def run_all_tests():
     """Run comprehensive test suite"""
-    print("\n" + "🚀 "*35)
+    print("\n" + _ROCKETS)
     print("🧪 RUNNING ENHANCED TEST SUITE")
-    print("🚀 "*35)
+    print(_ROCKETS)
     
     tests = [
         ("Puzzle Generator", test_puzzle_generator),
@@ -394,20 +464,20 @@ def run_all_tests():
             traceback.print_exc()
     
     # Print summary
-    print("\n" + "="*70)
+    print("\n" + _BANNER)
     print("📊 TEST SUMMARY")
-    print("="*70)
+    print(_BANNER)
     print(f"  Total Tests: {len(tests)}")
     print(f"  ✅ Passed: {passed}")
     print(f"  ❌ Failed: {failed}")
     print(f"  Success Rate: {(passed/len(tests)*100):.0f}%")
-    print("="*70)
+    print(_BANNER)
     
     if failed == 0:
         print("\n🎉 ALL TESTS PASSED! 🎉")
         print("\n✨ Your enhanced adaptive learning system is ready!")
         print("📦 Run: python src/main.py")
-        print("\n" + "="*70 + "\n")
+        print("\n" + _BANNER + "\n")
         return True
     else:
         print(f"\n⚠️  {failed} test(s) failed. Please review the errors above.")